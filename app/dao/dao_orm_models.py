@@ -1,47 +1,96 @@
 """Classes to retrieve data from database via ORM"""
 
+from cachetools import cached
 from copy import copy
+from itertools import starmap
 from app.models.models import AnimalCenter, Animal, AccessRequest, Species
 from app.dao.interfaces import IDaoAccessRequest, IDaoAnimalCenter, IDaoAnimal, IDaoSpecies, IDaoDeserializer
+from app.dao.query_cache import (animal_cache, animal_lock, center_cache, center_lock,
+                                 species_cache, species_lock, cache_key)
+from app.dao.rows import AnimalRow, AnimalShort, CenterRow, CenterShort, SpeciesCount, SpeciesRow
 from app import db
-from . import dao
-from werkzeug.security import check_password_hash
+from sqlalchemy.orm import selectinload
+from app.utils.security import verify_password
+
+
+# Monomorphic row builders mirroring the ones in dao_sql.py: one slotted
+# row object per shape, no long-flag branch on the per-row path.
+
+def _animal_short(record):
+    return AnimalShort(record.id, record.name)
+
+
+def _animal_long(record):
+    return AnimalRow(record.id, record.name, record.center_id,
+                     record.description, record.age,
+                     record.species_id, record.price)
+
+
+def _center_short(record):
+    return CenterShort(record.id, record.login)
+
+
+def _center_long(record):
+    return CenterRow(record.id, record.login, record.address)
+
+
+def _species_long(record):
+    return SpeciesRow(record.id, record.name,
+                      record.description, record.price)
 
 
 class AnimalCenterORM(IDaoAnimalCenter, IDaoDeserializer):
 
-    def deserialize(self, record=None, long=False):
+    @staticmethod
+    def deserialize(record=None, long=False):
         """
-        Function that create dictionary from object.
+        Function that create row object from record.
         :param long: Value of this param define which version of data will be returned. If value True function will
-                     return long version of dictionary with such keys: id, login, address. Otherwise dictionary wil
-                     not contain kye address.
-        :return data: Dictionary with information about object.
+                     return CenterRow with fields id, login and address. Otherwise CenterShort without address.
+        :return data: Row object with information about object.
         """
-        data = {'id': record.id,
-                'login': record.login}
-        if long:
-            data.update({'address': record.address})
-        return data
+        return _center_long(record) if long else _center_short(record)
 
     def check_password(self, password, user_id):
         record = AnimalCenter.query.get(user_id)
-        return check_password_hash(record.password_hash, password)
+        return verify_password(record.password_hash, password)
 
+    @cached(cache=center_cache, key=cache_key, lock=center_lock)
     def get_centers(self):
-        return [self.deserialize(record, long=False) for record in AnimalCenter.query.all()]
+        return list(starmap(
+            CenterShort, db.session.query(AnimalCenter.id, AnimalCenter.login)))
 
     def get_center_inform(self, id):
-        record = AnimalCenter.query.get(id)
+        record = AnimalCenter.query.options(
+            selectinload(AnimalCenter.animals)).get(id)
         if record:
-            return self.deserialize(record, long=True), \
-                   [dao.AnimalDAO.deserialize(animal) for animal in record.animals]
+            return _center_long(record), \
+                   [_animal_short(animal) for animal in record.animals]
         return None
 
+    def get_centers_inform(self, ids):
+        """
+        Bulk variant of get_center_inform: selectinload batches the animal
+        lookups into one IN query, so the whole call costs two queries.
+        :param ids: Iterable of center ids.
+        :return: List of (center, animals) pairs in the order of ids;
+                 unknown ids are skipped.
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        records = AnimalCenter.query.options(
+            selectinload(AnimalCenter.animals)).filter(
+            AnimalCenter.id.in_(ids)).all()
+        by_id = {record.id: record for record in records}
+        return [(_center_long(by_id[center_id]),
+                 [_animal_short(animal) for animal in by_id[center_id].animals])
+                for center_id in ids if center_id in by_id]
+
     def get_center_by_login(self, user_login):
         center = AnimalCenter.query.filter_by(login=user_login).first()
         if center:
-            return self.deserialize(center)
+            return _center_short(center)
         else:
             return None
 
@@ -50,6 +99,7 @@ class AnimalCenterORM(IDaoAnimalCenter, IDaoDeserializer):
         center.set_password(data['password'])
         db.session.add(center)
         db.session.commit()
+        center_cache.clear()
         return center.id
 
 
@@ -63,46 +113,57 @@ class AccessRequestORM(IDaoAccessRequest):
 
 class AnimalORM(IDaoAnimal, IDaoDeserializer):
 
-    def deserialize(self, record=None, long=False):
+    @staticmethod
+    def deserialize(record=None, long=False):
         """
-        Function that create dictionary from object.
+        Function that create row object from record.
         :param long: Value of this param define which version of data will be returned. If value True function will
-                     return long version of dictionary with such keys: id, name, center_id, description, age,
-                     species_id, price. Otherwise dictionary wil contain only id and name.
-        :return data: Dictionary with information about object.
+                     return AnimalRow with fields id, name, center_id, description, age, species_id and price.
+                     Otherwise AnimalShort with only id and name.
+        :return data: Row object with information about object.
         """
-        data = {'id': record.id,
-                'name': record.name}
-        if long:
-            data.update({
-                'center_id': record.center_id,
-                'description': record.description,
-                'age': record.age,
-                'species_id': record.species_id,
-                'price': record.price
-            })
-        return data
+        return _animal_long(record) if long else _animal_short(record)
 
     def get_animals(self):
-        animals = [self.deserialize(animal) for animal in Animal.query.all()]
-        return animals
+        # Generator counterpart of the SQL DAO: yield_per keeps memory flat
+        # while rows stream out of the cursor in batches, and starmap feeds
+        # them into the row constructor without a per-row Python frame.
+        yield from starmap(
+            AnimalShort, db.session.query(Animal.id, Animal.name).yield_per(1000))
 
     def add_animal(self, data, userid):
+        if isinstance(data, list):
+            # Bulk import: bulk_insert_mappings batches the whole list into
+            # executemany INSERTs without per-object unit-of-work bookkeeping.
+            rows = [{'name': item['name'], 'center_id': userid,
+                     'description': item['description'], 'price': item['price'],
+                     'species_id': item['species_id'], 'age': item['age']}
+                    for item in data]
+            db.session.bulk_insert_mappings(Animal, rows)
+            db.session.commit()
+            animal_cache.clear()
+            species_cache.clear()
+            return len(rows)
         animal = Animal(name=data['name'], center_id=userid,
                         description=data['description'], price=data['price'],
                         species_id=data['species_id'], age=data['age'])
         db.session.add(animal)
         db.session.commit()
-        return self.deserialize(animal)
+        animal_cache.clear()
+        species_cache.clear()
+        return AnimalShort(animal.id, animal.name)
 
+    @cached(cache=animal_cache, key=cache_key, lock=animal_lock)
     def get_animal(self, animal_id):
         animal = Animal.query.get(animal_id)
-        return self.deserialize(animal, long=True) if animal else None
+        return _animal_long(animal) if animal else None
 
     def delete_animal(self, animal_id):
         animal = Animal.query.get(animal_id)
         db.session.delete(animal)
         db.session.commit()
+        animal_cache.clear()
+        species_cache.clear()
 
     def update_animal(self, animal):
         animal = copy(animal)
@@ -111,35 +172,35 @@ class AnimalORM(IDaoAnimal, IDaoDeserializer):
         for key, value in animal.items():
             setattr(animal_obj, key, value)
         db.session.commit()
+        animal_cache.clear()
+        species_cache.clear()
 
 
 class SpeciesORM(IDaoSpecies, IDaoDeserializer):
 
-    def deserialize(self, record=None, long=False):
+    @staticmethod
+    def deserialize(record=None, long=False):
         """
-        Function that create dictionary from object.
-        :return: Dictionary with information about object.
+        Function that create row object from record.
+        :return: SpeciesRow with information about object.
         """
-        data = {'id': record.id,
-                'name': record.name,
-                'description': record.description,
-                'price': record.price}
-        return data
+        return _species_long(record)
 
+    @cached(cache=species_cache, key=cache_key, lock=species_lock)
     def get_species(self):
         result = db.session.query(
-            Species.name, db.func.count(Animal.name)) \
-            .join(Animal, Species.id == Animal.species_id, isouter=True) \
-            .group_by(Species.id).all()
-        return [{'species_name': name, 'count_of_animals': count} for name, count in result]
+            Species.name, db.func.count(Animal.id)) \
+            .join(Animal, Animal.species_id == Species.id, isouter=True) \
+            .group_by(Species.id, Species.name).all()
+        return list(starmap(SpeciesCount, result))
 
+    @cached(cache=species_cache, key=cache_key, lock=species_lock)
     def get_species_inform(self, id):
-        species = Species().query.get(id)
-        animals = Animal.query.filter_by(species_id=id).all()
-
+        species = Species.query.options(
+            selectinload(Species.animals)).get(id)
         if species:
-            return self.deserialize(species, long=True),\
-                   [dao.AnimalDAO.deserialize(animal) for animal in animals]
+            return _species_long(species),\
+                   [_animal_short(animal) for animal in species.animals]
         else:
             return None
 
@@ -148,11 +209,12 @@ class SpeciesORM(IDaoSpecies, IDaoDeserializer):
                          price=data['price'])
         db.session.add(specie)
         db.session.commit()
-        return self.deserialize(specie, long=True)
+        species_cache.clear()
+        return _species_long(specie)
 
     def get_species_by_name(self, name):
         species = Species.query.filter_by(name=name).first()
         if species:
-            return self.deserialize(species)
+            return _species_long(species)
         else:
             return None
@@ -1,154 +1,312 @@
 """Classes to retrieve data from database via SQL"""
 
+import json
 from app import db
+from cachetools import cached
 from copy import copy
-from werkzeug.security import check_password_hash, generate_password_hash
+from collections import defaultdict
+from itertools import combinations, starmap
+from sqlalchemy import bindparam, text
+from app.utils.security import generate_password_hash, verify_password
 from app.dao.interfaces import IDaoAnimalCenter, IDaoAccessRequest, IDaoSpecies, IDaoAnimal
+from app.dao.query_cache import (animal_cache, animal_lock, center_cache, center_lock,
+                                 species_cache, species_lock, cache_key)
+from app.dao.rows import AnimalRow, AnimalShort, CenterRow, CenterShort, SpeciesCount, SpeciesRow
 from datetime import datetime
 
+# Columns of animal that update_animal is allowed to touch. Keys outside
+# this set never reach the generated SQL.
+ANIMAL_UPDATE_COLUMNS = frozenset(
+    ['name', 'center_id', 'description', 'age', 'species_id', 'price'])
+
+
+def _build_update_stmts():
+    """
+    Precompile one UPDATE statement per subset of updatable columns.
+    update_animal then picks a statement by frozenset lookup instead of
+    assembling SQL per call, and the database sees a small fixed family of
+    statements it can keep cached plans for.
+    """
+    stmts = {}
+    columns = sorted(ANIMAL_UPDATE_COLUMNS)
+    for size in range(1, len(columns) + 1):
+        for subset in combinations(columns, size):
+            assignments = ','.join('{0}=:{0}'.format(column) for column in subset)
+            stmts[frozenset(subset)] = text(
+                "UPDATE animal SET {} WHERE id=:id".format(assignments))
+    return stmts
+
+
+_UPDATE_STMTS = _build_update_stmts()
+
+# Every fixed statement is compiled to a text() object once at import, so
+# per-call cost is binding parameters, not re-parsing SQL strings.
+LIST_ANIMALS = text("SELECT id, name FROM animal;")
+GET_ANIMAL_BY_ID = text(
+    "SELECT id, center_id, name, description, age, species_id, price "
+    "FROM animal WHERE id=:id")
+DELETE_ANIMAL = text("DELETE FROM animal WHERE id=:id")
+INSERT_ANIMAL = text(
+    "INSERT INTO animal (name, center_id, description, price, species_id, age) "
+    "VALUES (:name, :center_id, :description, :price, :species_id, :age);")
+LIST_CENTERS = text("SELECT id, login FROM animal_center;")
+# The detail statements return the children pre-aggregated as a JSON array
+# (json_group_array here; json_agg on Postgres), so one round-trip carries
+# the parent and all its animals and Python never loops over child rows.
+GET_CENTER_WITH_ANIMALS = text(
+    "SELECT animal_center.id, animal_center.login, animal_center.address, "
+    "json_group_array(json_object('id', animal.id, 'name', animal.name)) "
+    "FILTER (WHERE animal.id IS NOT NULL) "
+    "FROM animal_center "
+    "LEFT JOIN animal ON animal.center_id = animal_center.id "
+    "WHERE animal_center.id=:id "
+    "GROUP BY animal_center.id, animal_center.login, animal_center.address;")
+GET_CENTERS_BY_IDS = text(
+    "SELECT id, login, address FROM animal_center "
+    "WHERE id IN :ids;").bindparams(bindparam('ids', expanding=True))
+GET_ANIMALS_BY_CENTER_IDS = text(
+    "SELECT center_id, id, name FROM animal "
+    "WHERE center_id IN :ids;").bindparams(bindparam('ids', expanding=True))
+GET_CENTER_BY_LOGIN = text(
+    "SELECT id, login, address FROM animal_center WHERE login=:login;")
+GET_PASSWORD_HASH = text(
+    "SELECT password_hash FROM animal_center WHERE id =:id;")
+INSERT_CENTER = text(
+    "INSERT INTO animal_center (login, password_hash, address) "
+    "VALUES (:login, :password_hash, :address);")
+INSERT_ACCESS_REQUEST = text(
+    "INSERT INTO access_request (center_id, timestamp) VALUES (:id, :timestamp);")
+LIST_SPECIES_COUNTS = text(
+    "SELECT species.name, count(animal.id) FROM species "
+    "LEFT OUTER JOIN animal ON animal.species_id = species.id "
+    "GROUP BY species.id, species.name")
+GET_SPECIES_WITH_ANIMALS = text(
+    "SELECT species.id, species.name, species.description, species.price, "
+    "json_group_array(json_object('id', animal.id, 'name', animal.name)) "
+    "FILTER (WHERE animal.id IS NOT NULL) "
+    "FROM species "
+    "LEFT JOIN animal ON animal.species_id = species.id "
+    "WHERE species.id = :id "
+    "GROUP BY species.id, species.name, species.description, species.price;")
+INSERT_SPECIES = text(
+    "INSERT INTO species (name, description, price) "
+    "VALUES (:name, :description, :price);")
+GET_SPECIES_BY_NAME = text(
+    "SELECT id, name, description, price FROM species WHERE name = :name;")
+
+
+# Monomorphic row builders for the hot list/detail paths. Each builds a
+# slotted row object straight from tuple indexes, without a long-flag
+# branch on the per-row path.
+
+def _animal_short(record):
+    # expects an (id, name) row; the short views never fetch more
+    return AnimalShort(record[0], record[1])
+
+
+def _animal_long(record):
+    return AnimalRow(record[0], record[2], record[1], record[3],
+                     record[4], record[5], record[6])
+
+
+def _center_short(record):
+    return CenterShort(record[0], record[1])
+
+
+def _center_long(record):
+    return CenterRow(record[0], record[1], record[2])
+
+
+def _species_count(record):
+    return SpeciesCount(record[0], record[1])
+
+
+def _species_long(record):
+    return SpeciesRow(record[0], record[1], record[2], record[3])
+
 
 class AnimalsDaoSql(IDaoAnimal):
-    def deserialize(self, record=None, long=False):
-        data = {
-            'id': record[0],
-            'name': record[2]
-        }
-        if long:
-            data.update({
-                'center_id': record[1],
-                'description': record[3],
-                'age': record[4],
-                'species_id': record[5],
-                'price': record[6]
-            })
-        return data
+    @staticmethod
+    def deserialize(record=None, long=False):
+        return _animal_long(record) if long else _animal_short(record)
 
     def get_animals(self):
-        records = db.engine.execute("SELECT * FROM animal;")
-        return [AnimalsDaoSql().deserialize(record) for record in records]
+        # Generator over a server-side cursor: rows are converted and handed
+        # to the caller one by one instead of materializing the whole table.
+        # starmap feeds each (id, name) row straight into the row
+        # constructor from C, with no per-row Python frame in between.
+        with db.engine.connect() as connection:
+            records = connection.execution_options(stream_results=True).execute(
+                LIST_ANIMALS)
+            yield from starmap(AnimalShort, records)
 
+    @cached(cache=animal_cache, key=cache_key, lock=animal_lock)
     def get_animal(self, animal_id):
-        record = db.engine.execute(
-            "SELECT * FROM animal WHERE id=:id", {"id":animal_id}).first()
-        return AnimalsDaoSql().deserialize(record, long=True) if record else None
+        with db.engine.connect() as connection:
+            record = connection.execute(
+                GET_ANIMAL_BY_ID, {"id": animal_id}).first()
+        return _animal_long(record) if record else None
 
     def delete_animal(self, animal_id):
-        db.engine.execute("DELETE FROM animal WHERE id=:id", {'id': animal_id})
+        with db.engine.connect() as connection:
+            connection.execute(DELETE_ANIMAL, {'id': animal_id})
+        animal_cache.clear()
+        species_cache.clear()
 
     def update_animal(self, animal):
         animal = copy(animal)
         animal_id = animal.pop('id')
 
-        update_string = ','.join(
-            ["{key}=:{key}".format(key=key) for key in animal.keys()])
-
-        animal['id'] = animal_id
+        columns = frozenset(animal) & ANIMAL_UPDATE_COLUMNS
+        if not columns:
+            return
+        params = {key: animal[key] for key in columns}
+        params['id'] = animal_id
 
-        db.engine.execute(
-            "UPDATE animal SET {} WHERE id=:id".format(update_string), animal)
+        with db.engine.connect() as connection:
+            connection.execute(_UPDATE_STMTS[columns], params)
+        animal_cache.clear()
+        species_cache.clear()
 
     def add_animal(self, data, userid):
+        if isinstance(data, list):
+            # Bulk import: one executemany round-trip for the whole batch.
+            rows = [{'name': item['name'], 'center_id': userid,
+                     'description': item['description'], 'price': item['price'],
+                     'species_id': item['species_id'], 'age': item['age']}
+                    for item in data]
+            if not rows:
+                # executemany with an empty list degenerates into a single
+                # execute with no parameters; treat it as a no-op like the
+                # ORM DAO does.
+                return 0
+            with db.engine.connect() as connection:
+                connection.execute(INSERT_ANIMAL, rows)
+            animal_cache.clear()
+            species_cache.clear()
+            return len(rows)
+
         values = {'name': data['name'], 'center_id': userid,
                   'description':data['description'], 'price': data['price'],
                   'species_id': data['species_id'], 'age': data['age']}
 
-        db.engine.execute("INSERT INTO animal (name, center_id, description, price, species_id, age) "
-                          "VALUES (:name, :center_id, :description, :price, :species_id, :age);",
-                          values)
-        animal = db.engine.execute("SELECT * FROM animal WHERE id = (SELECT MAX(id) FROM animal);").first()
-        return AnimalsDaoSql().deserialize(animal)
+        with db.engine.connect() as connection:
+            result = connection.execute(INSERT_ANIMAL, values)
+        animal_cache.clear()
+        species_cache.clear()
+        # lastrowid comes back with the INSERT itself, so no second
+        # round-trip and no race with concurrent inserts.
+        return AnimalShort(result.lastrowid, values['name'])
 
 
 class AnimalCentersDaoSql(IDaoAnimalCenter):
-    def deserialize(self, record=None, long=False):
-        data = {'id': record.id,
-                'login': record.login}
-        if long:
-            data.update({'address': record.address})
-        return data
+    @staticmethod
+    def deserialize(record=None, long=False):
+        return _center_long(record) if long else _center_short(record)
 
+    @cached(cache=center_cache, key=cache_key, lock=center_lock)
     def get_centers(self):
-        records = db.engine.execute("SELECT * FROM animal_center;")
-        return [AnimalCentersDaoSql().deserialize(record, long=False) for record in records]
+        with db.engine.connect() as connection:
+            records = connection.execute(LIST_CENTERS).fetchall()
+        return list(starmap(CenterShort, records))
 
     def get_center_inform(self, id):
-        record = db.engine.execute(
-            "SELECT * FROM animal_center WHERE id=:id;",{'id': id}).first()
-        animals = db.engine.execute(
-            "SELECT * FROM animal WHERE center_id=:id;", {'id': id}
-        )
-        if record:
-            return AnimalCentersDaoSql().deserialize(record, long=True), \
-                   [AnimalsDaoSql().deserialize(animal) for animal in animals] if record else None
-        else:
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                GET_CENTER_WITH_ANIMALS, {'id': id}).first()
+        if not row:
             return None
+        return CenterRow(row[0], row[1], row[2]), \
+            [AnimalShort(animal['id'], animal['name'])
+             for animal in json.loads(row[3])]
+
+    def get_centers_inform(self, ids):
+        """
+        Bulk variant of get_center_inform: two IN queries serve any number
+        of centers instead of two queries per center.
+        :param ids: Iterable of center ids.
+        :return: List of (center, animals) pairs in the order of ids;
+                 unknown ids are skipped.
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+        with db.engine.connect() as connection:
+            centers = connection.execute(
+                GET_CENTERS_BY_IDS, {'ids': ids}).fetchall()
+            animals = connection.execute(
+                GET_ANIMALS_BY_CENTER_IDS, {'ids': ids}).fetchall()
+        grouped = defaultdict(list)
+        for row in animals:
+            grouped[row[0]].append(AnimalShort(row[1], row[2]))
+        by_id = {row[0]: _center_long(row) for row in centers}
+        return [(by_id[center_id], grouped[center_id])
+                for center_id in ids if center_id in by_id]
 
     def get_center_by_login(self, user_login):
-        record = db.engine.execute(
-            "SELECT * FROM animal_center WHERE login=:login;",
-            {'login': user_login}).first()
-        return AnimalCentersDaoSql().deserialize(record, long=True) if record else None
+        with db.engine.connect() as connection:
+            record = connection.execute(
+                GET_CENTER_BY_LOGIN, {'login': user_login}).first()
+        return _center_long(record) if record else None
 
     def check_password(self, password, user_id=None):
-        record = db.engine.execute(
-            "SELECT password_hash FROM animal_center "
-            "WHERE id =:id;", {'id': user_id}).first()
-        return check_password_hash(record.password_hash, password)
+        with db.engine.connect() as connection:
+            record = connection.execute(
+                GET_PASSWORD_HASH, {'id': user_id}).first()
+        return verify_password(record[0], password)
 
     def add_center(self, data):
         password = data.pop('password')
         data['password_hash'] = generate_password_hash(password)
-        db.engine.execute(
-            "INSERT INTO animal_center (login, password_hash, address) "
-            "VALUES (:login, :password_hash, :address);", data)
-        return db.engine.execute("SELECT MAX(id) FROM animal_center;").first()[0]
+        with db.engine.connect() as connection:
+            result = connection.execute(INSERT_CENTER, data)
+        center_cache.clear()
+        return result.lastrowid
 
 
 class AccessRequestDaoSql(IDaoAccessRequest):
     def create_access_request(self, user_id):
-        db.engine.execute(
-            "INSERT INTO access_request (center_id, timestamp) VALUES (:id, :timestamp);",
-            {'id': user_id, 'timestamp': datetime.now()})
+        with db.engine.connect() as connection:
+            connection.execute(
+                INSERT_ACCESS_REQUEST, {'id': user_id, 'timestamp': datetime.now()})
 
 
 class SpeciesDaoSql(IDaoSpecies):
-    def deserialize(self, record=None, long=False):
-        data = {'species_name': record[0],
-                'count_of_animals': record[1]}
-        if long:
-            data = {'id': record[0],
-                'name': record[1],
-                'description': record[2],
-                'price': record[3]}
-        return data
+    @staticmethod
+    def deserialize(record=None, long=False):
+        return _species_long(record) if long else _species_count(record)
 
+    @cached(cache=species_cache, key=cache_key, lock=species_lock)
     def get_species(self):
-        records = db.engine.execute("SELECT species.name, count(animal.name) FROM species "
-                                   "LEFT OUTER JOIN animal ON species.id = animal.species_id "
-                                   "GROUP BY species.name")
-        return [SpeciesDaoSql().deserialize(record) for record in records]
+        with db.engine.connect() as connection:
+            records = connection.execute(LIST_SPECIES_COUNTS).fetchall()
+        return list(starmap(SpeciesCount, records))
 
+    @cached(cache=species_cache, key=cache_key, lock=species_lock)
     def get_species_inform(self, id):
-        record = db.engine.execute("SELECT * FROM species WHERE id = :id;", {'id': id}).first()
-        animals = db.engine.execute("SELECT * FROM animal WHERE species_id = :id;", {'id': id})
-        if record:
-            return SpeciesDaoSql().deserialize(record, long=True),\
-                   [AnimalsDaoSql().deserialize(animal) for animal in animals]
-        else:
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                GET_SPECIES_WITH_ANIMALS, {'id': id}).first()
+        if not row:
             return None
+        return SpeciesRow(row[0], row[1], row[2], row[3]), \
+            [AnimalShort(animal['id'], animal['name'])
+             for animal in json.loads(row[4])]
 
     def add_species(self, data):
         values = {'name': data['name'],  'description': data['description'],
                   'price': data['price']}
-        db.engine.execute("INSERT INTO species (name, description, price) "
-                          "VALUES (:name, :description, :price);", values)
-        specie = db.engine.execute("SELECT * FROM species WHERE id = (SELECT MAX(id) FROM species);").first()
-        return SpeciesDaoSql().deserialize(specie, long=True)
+        with db.engine.connect() as connection:
+            result = connection.execute(INSERT_SPECIES, values)
+        species_cache.clear()
+        return SpeciesRow(result.lastrowid, values['name'],
+                          values['description'], values['price'])
 
     def get_species_by_name(self, name):
-        species = db.engine.execute(
-            "SELECT * FROM species WHERE name = :name;", {'name': name}).first()
+        with db.engine.connect() as connection:
+            species = connection.execute(
+                GET_SPECIES_BY_NAME, {'name': name}).first()
         if species:
-            return self.deserialize(species)
+            return _species_long(species)
         else:
             return None
\ No newline at end of file
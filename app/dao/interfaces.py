@@ -6,9 +6,10 @@ from abc import ABCMeta, abstractmethod
 class IDaoDeserializer:
     __metaclass__ = ABCMeta
 
+    @staticmethod
     @abstractmethod
-    def deserialize(self, record=None, long=False):
-        """Create dict from object"""
+    def deserialize(record=None, long=False):
+        """Create a row object from a database record"""
 
 
 class IDaoAnimalCenter(IDaoDeserializer):
@@ -22,6 +23,10 @@ class IDaoAnimalCenter(IDaoDeserializer):
     def get_center_inform(self, id):
         """Get detailed information about center"""
 
+    @abstractmethod
+    def get_centers_inform(self, ids):
+        """Get detailed information about several centers at once"""
+
     @abstractmethod
     def get_center_by_login(self, user_login):
         """Get center inform by login"""
@@ -0,0 +1,24 @@
+"""Shared TTL caches for read-mostly DAO queries"""
+
+import threading
+from cachetools import TTLCache
+
+# One minute of staleness is acceptable for these read-mostly endpoints;
+# write methods clear the affected cache so changes show up immediately.
+# cachetools caches are not thread-safe, so each cache pairs with a lock
+# that every cached() site must pass along — the app serves requests from
+# multiple threads.
+animal_cache = TTLCache(maxsize=1024, ttl=60)
+animal_lock = threading.Lock()
+center_cache = TTLCache(maxsize=1024, ttl=60)
+center_lock = threading.Lock()
+species_cache = TTLCache(maxsize=1024, ttl=60)
+species_lock = threading.Lock()
+
+
+def cache_key(self, *args):
+    """
+    Build a cache key from the DAO class and call arguments, skipping self
+    so the singleton instances in dao.py do not leak into the key.
+    """
+    return (type(self).__name__,) + args
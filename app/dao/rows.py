@@ -0,0 +1,98 @@
+"""Slotted row types used by the DAOs as their transport format.
+
+A slotted dataclass stores its fields in fixed slots instead of a
+per-instance __dict__, which cuts per-row memory several times over on the
+list endpoints and makes attribute access faster. Conversion back to a
+plain dict happens once, at the response edge, via to_jsonable.
+
+Rows are deliberately not validated field by field: they are built from
+trusted database output, and request payloads are already checked once at
+the HTTP edge by the jsonschema decorators in app.utils. Re-validating at
+every DAO hop would just burn CPU on data the database already guarantees.
+"""
+
+import sys
+from dataclasses import dataclass, fields
+
+# slots support for dataclasses arrived in Python 3.10; on older
+# interpreters a regular dataclass is used.
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+class SerializableRow:
+    """
+    Base class for the row dataclasses. Provides one shared to_dict built
+    from the dataclass fields (resolved once per class, then cached) and a
+    from_tuple constructor for rows whose column order matches the field
+    order.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        cls = type(self)
+        names = cls.__dict__.get('_field_names')
+        if names is None:
+            names = tuple(field.name for field in fields(self))
+            cls._field_names = names
+        return {name: getattr(self, name) for name in names}
+
+    @classmethod
+    def from_tuple(cls, row):
+        return cls(*row)
+
+
+@dataclass(**_SLOTS)
+class AnimalShort(SerializableRow):
+    id: int
+    name: str
+
+
+@dataclass(**_SLOTS)
+class AnimalRow(SerializableRow):
+    id: int
+    name: str
+    center_id: int
+    description: str
+    age: int
+    species_id: int
+    price: float
+
+
+@dataclass(**_SLOTS)
+class CenterShort(SerializableRow):
+    id: int
+    login: str
+
+
+@dataclass(**_SLOTS)
+class CenterRow(SerializableRow):
+    id: int
+    login: str
+    address: str
+
+
+@dataclass(**_SLOTS)
+class SpeciesRow(SerializableRow):
+    id: int
+    name: str
+    description: str
+    price: float
+
+
+@dataclass(**_SLOTS)
+class SpeciesCount(SerializableRow):
+    species_name: str
+    count_of_animals: int
+
+
+def to_jsonable(value):
+    """
+    Recursively convert a DAO return value (row object, tuple or list of
+    them) into plain JSON-serializable structures. Dicts and scalars pass
+    through untouched, so callers that still hand over dicts keep working.
+    """
+    if isinstance(value, SerializableRow):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
@@ -2,7 +2,7 @@
 
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.security import generate_password_hash, check_password_hash
 
 
 class AnimalCenter(db.Model):
@@ -16,7 +16,7 @@ class AnimalCenter(db.Model):
         address (string): The address of animal center.
     """
     id = db.Column(db.Integer, primary_key=True)
-    login = db.Column(db.String(20))
+    login = db.Column(db.String(20), unique=True, index=True)
     password_hash = db.Column(db.String(256))
     address = db.Column(db.String(200))
     animals = db.relationship("Animal", backref="animals")
@@ -65,6 +65,13 @@ class Animal(db.Model):
     :param price (float): Animal price.
 
     """
+    # get_center_inform filters on center_id and get_species_inform plus
+    # the species count aggregation filter/group on species_id, so both
+    # get point-lookup indexes instead of table scans.
+    __table_args__ = (
+        db.Index('ix_animal_center_id', 'center_id'),
+        db.Index('ix_animal_species_id', 'species_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     center_id = db.Column(db.Integer, db.ForeignKey("animal_center.id"))
     name = db.Column(db.String(40))
@@ -87,3 +94,4 @@ class Species(db.Model):
     name = db.Column(db.String(40))
     description = db.Column(db.String(500), nullable=True)
     price = db.Column(db.Float, nullable=True)
+    animals = db.relationship("Animal", backref="species")
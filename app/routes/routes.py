@@ -1,12 +1,33 @@
 """Functions that are registered as enpoints in flask application"""
+import json
 from app.utils import decorators, schemas, log
-from flask import request, jsonify, Blueprint, current_app
+from flask import request, jsonify, Blueprint, current_app, Response, stream_with_context
 from flask_jwt_extended import create_access_token, get_jwt_identity
 from app.dao import dao
+from app.dao.rows import to_jsonable
 
 bp = Blueprint("app", __name__)
 
 
+def stream_json_list(items):
+    """
+    Build a chunked JSON array response from any iterable of serializable
+    items. With generator DAOs the first bytes go out before the last row
+    has even been fetched, and peak memory stays constant.
+    """
+    def generate():
+        yield '['
+        first = True
+        for item in items:
+            if first:
+                first = False
+            else:
+                yield ', '
+            yield json.dumps(to_jsonable(item))
+        yield ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
 @bp.after_request
 def add_dao_header(response):
     response.headers['DAO_TYPE'] = 'SQL' if current_app.config['DAO_SQL'] else "ORM"
@@ -29,7 +50,7 @@ def login():
     user_password = request.args.get('password')
     if not user_login or not user_password:
         return jsonify(message="Login and password are required"), 400
-    user = dao.AnimalCenterDAO.get_center_by_login(user_login)
+    user = to_jsonable(dao.AnimalCenterDAO.get_center_by_login(user_login))
     if not user:
         return jsonify(message="No user with such login"), 400
 
@@ -46,13 +67,13 @@ def login():
 @decorators.json_validate_for_change(schemas.animal_schema)
 def animals():
     if request.method == 'GET':
-        return jsonify(dao.AnimalDAO.get_animals())
+        return stream_json_list(dao.AnimalDAO.get_animals())
     else:
         data = request.get_json()
         user_id = get_jwt_identity()
         if not dao.SpeciesDAO.get_species_inform(data['species_id']):
             return jsonify(message="No such specie"), 400
-        animal = dao.AnimalDAO.add_animal(data, user_id)
+        animal = to_jsonable(dao.AnimalDAO.add_animal(data, user_id))
         log.log_request(request.method, request.url, user_id, 'animal', animal['id'])
         return jsonify(animal), 201
 
@@ -69,7 +90,7 @@ def animal_inform(id):
              If request method DELETE function will return id of animal that was deleted.
              If request method PUT function will change param that give user and return detailed information about animal.
     """
-    animal = dao.AnimalDAO.get_animal(id)
+    animal = to_jsonable(dao.AnimalDAO.get_animal(id))
     if not animal:
         return jsonify(message='Not found'), 404
     if request.method == 'GET':
@@ -94,7 +115,7 @@ def centers_list():
     Function that view all animal centers.
     :return: Short information about centers (id and login).
     """
-    return jsonify(dao.AnimalCenterDAO.get_centers())
+    return stream_json_list(dao.AnimalCenterDAO.get_centers())
 
 
 @bp.route('/centers/<int:id>', methods=['GET'])
@@ -107,7 +128,7 @@ def center_inform(id):
     center = dao.AnimalCenterDAO.get_center_inform(id)
     if not center:
         return jsonify({'message': 'Not found'}), 404
-    return jsonify(center)
+    return jsonify(to_jsonable(center))
 
 
 @bp.route('/species', methods=['GET', 'POST'])
@@ -122,12 +143,12 @@ def species():
              If method POST,function will return detailed information about species.
     """
     if request.method == 'GET':
-        return jsonify(dao.SpeciesDAO.get_species())
+        return jsonify(to_jsonable(dao.SpeciesDAO.get_species()))
     else:
         data = request.get_json()
         if dao.SpeciesDAO.get_species_by_name(data['name']):
             return jsonify(message="This species is already taken"), 400
-        specie = dao.SpeciesDAO.add_species(data)
+        specie = to_jsonable(dao.SpeciesDAO.add_species(data))
         user_id = get_jwt_identity()
         log.log_request(request.method, request.url, user_id, 'species', specie['id'])
         return jsonify(specie), 201
@@ -143,7 +164,7 @@ def specie_inform(id):
     result = dao.SpeciesDAO.get_species_inform(id)
     if not result:
         return jsonify({'message':'Not found'}), 404
-    return jsonify(result)
+    return jsonify(to_jsonable(result))
 
 
 @bp.route('/register', methods=['POST'])
@@ -0,0 +1,82 @@
+"""Password hashing helpers built on OpenSSL-backed KDFs.
+
+werkzeug's default pbkdf2 runs its SHA-256 rounds in Python-driven hashlib
+calls; hashlib.scrypt goes straight to OpenSSL, which dispatches to the
+CPU's SHA extensions where available, so login-time hashing costs a
+fraction of the pbkdf2 default. Hashes use the same method$salt$hash
+layout werkzeug uses, and verification falls back to werkzeug for
+pre-existing pbkdf2 hashes so old accounts keep working.
+"""
+
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from os import urandom
+from werkzeug.security import check_password_hash as _check_legacy_hash
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+# scrypt needs roughly 128 * N * r bytes of scratch memory; the default
+# maxmem is too small for N=2**14, so give it headroom.
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+
+def generate_password_hash(password):
+    """
+    Hash a password with scrypt.
+    :param password: Plain-text password to hash.
+    :return: Hash string 'scrypt:N:r:p$salt$hash' (hex salt and hash).
+    """
+    salt = urandom(SALT_BYTES)
+    derived = hashlib.scrypt(password.encode('utf-8'), salt=salt,
+                             n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                             maxmem=SCRYPT_MAXMEM)
+    return 'scrypt:{}:{}:{}${}${}'.format(
+        SCRYPT_N, SCRYPT_R, SCRYPT_P, salt.hex(), derived.hex())
+
+
+def check_password_hash(pwhash, password):
+    """
+    Check a password against a stored hash.
+    :param pwhash: Stored hash; scrypt hashes are verified here, anything
+                   else (legacy pbkdf2) is handed to werkzeug.
+    :param password: Plain-text password to check.
+    :return: True if the password matches.
+    """
+    if not pwhash.startswith('scrypt:'):
+        return _check_legacy_hash(pwhash, password)
+    method, salt_hex, hash_hex = pwhash.split('$', 2)
+    _, n, r, p = method.split(':')
+    derived = hashlib.scrypt(password.encode('utf-8'),
+                             salt=bytes.fromhex(salt_hex),
+                             n=int(n), r=int(r), p=int(p),
+                             maxmem=SCRYPT_MAXMEM)
+    return hmac.compare_digest(derived.hex(), hash_hex)
+
+
+# KDFs are intentionally slow, so verification runs on a small worker pool
+# rather than inline on the serving thread. Threads are enough here:
+# hashlib.scrypt releases the GIL while OpenSSL derives the key, so other
+# requests keep running while a login is being checked. The pool is
+# created lazily so importing this module stays free.
+_verify_pool = None
+
+
+def _get_verify_pool():
+    global _verify_pool
+    if _verify_pool is None:
+        _verify_pool = ThreadPoolExecutor(max_workers=4,
+                                          thread_name_prefix='pwverify')
+    return _verify_pool
+
+
+def verify_password(pwhash, password):
+    """
+    Check a password against a stored hash on the verification pool.
+    Blocks the caller until the result is ready, but lets the interpreter
+    serve other threads while the KDF runs.
+    """
+    return _get_verify_pool().submit(
+        check_password_hash, pwhash, password).result()
@@ -1,6 +1,10 @@
 """pytests fixtures"""
 
+import contextlib
 import pytest
+from sqlalchemy import event
+from app import db
+from app.dao import dao, dao_orm_models, dao_sql, query_cache
 from app.main import create_app
 
 
@@ -11,6 +15,59 @@ def test_app():
     return app
 
 
+_DAO_IMPLEMENTATIONS = {
+    'orm': {'SpeciesDAO': dao_orm_models.SpeciesORM(),
+            'AnimalCenterDAO': dao_orm_models.AnimalCenterORM(),
+            'AccessRequestDAO': dao_orm_models.AccessRequestORM(),
+            'AnimalDAO': dao_orm_models.AnimalORM()},
+    'sql': {'SpeciesDAO': dao_sql.SpeciesDaoSql(),
+            'AnimalCenterDAO': dao_sql.AnimalCentersDaoSql(),
+            'AccessRequestDAO': dao_sql.AccessRequestDaoSql(),
+            'AnimalDAO': dao_sql.AnimalsDaoSql()},
+}
+
+
+@pytest.fixture(scope='function', params=['orm', 'sql'])
+def db_app(request, monkeypatch):
+    """This fixture creates flask application bound to a fresh in-memory
+    database, for tests that exercise the DAOs against real SQL. It runs
+    each test twice, once with the ORM DAOs and once with the raw-SQL
+    DAOs patched into dao, so both implementations stay covered whatever
+    Config.DAO_SQL says. The DAO query caches are cleared so no entries
+    leak between tests."""
+    for name, instance in _DAO_IMPLEMENTATIONS[request.param].items():
+        monkeypatch.setattr(dao, name, instance)
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    query_cache.animal_cache.clear()
+    query_cache.center_cache.clear()
+    query_cache.species_cache.clear()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope='function')
+def count_queries():
+    """This fixture returns a context manager that collects every SQL
+    statement sent to the database while its block runs, so tests can
+    assert how many queries a DAO call costs and catch N+1 regressions."""
+    @contextlib.contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counter
+
+
 @pytest.fixture(scope='function')
 def client(test_app):
     """This fixture creates test client from test application that can perform
@@ -0,0 +1,51 @@
+"""Query-count regression tests for the DAO layer"""
+
+from app.dao import dao
+from app.dao.rows import to_jsonable
+
+
+def _seed(center_count=2, animals_per_center=2):
+    """Fill the test database with a species and a few centers/animals,
+    returning the center ids and the species id."""
+    species = to_jsonable(dao.SpeciesDAO.add_species(
+        {'name': 'cat', 'description': 'good cat', 'price': 160}))
+    center_ids = []
+    for index in range(center_count):
+        center_id = dao.AnimalCenterDAO.add_center(
+            {'login': 'center%d' % index, 'password': 'pw', 'address': 'addr'})
+        center_ids.append(center_id)
+        for animal_index in range(animals_per_center):
+            dao.AnimalDAO.add_animal(
+                {'name': 'animal%d_%d' % (index, animal_index),
+                 'description': 'd', 'age': 1,
+                 'species_id': species['id'], 'price': 10}, center_id)
+    return center_ids, species['id']
+
+
+def test_get_center_inform_runs_bounded_queries(db_app, count_queries):
+    """Center details must cost a fixed number of queries, however many
+    animals the center has (the old code lazy-loaded them)."""
+    center_ids, _ = _seed(center_count=1, animals_per_center=3)
+    with count_queries() as statements:
+        center, animals = dao.AnimalCenterDAO.get_center_inform(center_ids[0])
+    assert len(animals) == 3
+    assert len(statements) <= 2
+
+
+def test_get_species_inform_runs_bounded_queries(db_app, count_queries):
+    """Species details must not issue one query per animal."""
+    _, species_id = _seed(center_count=2, animals_per_center=2)
+    with count_queries() as statements:
+        species, animals = dao.SpeciesDAO.get_species_inform(species_id)
+    assert len(animals) == 4
+    assert len(statements) <= 2
+
+
+def test_get_centers_inform_is_not_linear_in_centers(db_app, count_queries):
+    """The bulk variant must stay at two queries regardless of how many
+    centers are requested."""
+    center_ids, _ = _seed(center_count=3, animals_per_center=1)
+    with count_queries() as statements:
+        result = dao.AnimalCenterDAO.get_centers_inform(center_ids)
+    assert len(result) == 3
+    assert len(statements) <= 2